@@ -1,7 +1,8 @@
+import copy
 import datetime
-from django.test import TestCase
+import functools
+from django.test import SimpleTestCase, TestCase
 from django.utils import timezone
-from wagtail.blocks import StreamValue
 
 from wagtail_streamfield_migration_toolkit import migrate_operation
 
@@ -17,7 +18,36 @@ from wagtail_streamfield_migration_toolkit.operations import (
 )
 
 
-class TestExceptionRaisedInRawData(TestCase):
+# Blocks named `invalid_name1` have no matching block def in the models. Copy before use, since the
+# stream data they are added to may be modified.
+_INVALID_BLOCKS = (
+    {
+        "type": "invalid_name1",
+        "id": "0001",
+        "value": {"char1": "foo", "char2": "foo"},
+    },
+    {
+        "type": "invalid_name1",
+        "id": "0002",
+        "value": {"char1": "foo", "char2": "foo"},
+    },
+)
+
+
+@functools.lru_cache(maxsize=1)
+def _base_raw_data():
+    """Raw stream data with a char block and a nested struct block, built by the factories once.
+    Copy before use, since it is shared."""
+
+    return list(
+        factories.SampleModelFactory.build(
+            content__0__char1__value="Char Block 1",
+            content__1="nestedstruct",
+        ).content.raw_data
+    )
+
+
+class TestExceptionRaisedInRawData(SimpleTestCase):
     """Directly test whether an exception is raised by apply_changes_to_raw_data for invalid defs.
 
     This would happen in a situation where the user gives a block path which contains a block name
@@ -26,25 +56,10 @@ class TestExceptionRaisedInRawData(TestCase):
     """
 
     @classmethod
-    def setUpTestData(cls):
-        raw_data = factories.SampleModelFactory(
-            content__0__char1__value="Char Block 1",
-            content__1="nestedstruct",
-        ).content.raw_data
-        raw_data.extend(
-            [
-                {
-                    "type": "invalid_name1",
-                    "id": "0001",
-                    "value": {"char1": "foo", "char2": "foo"},
-                },
-                {
-                    "type": "invalid_name1",
-                    "id": "0002",
-                    "value": {"char1": "foo", "char2": "foo"},
-                },
-            ]
-        )
+    def setUpClass(cls):
+        super().setUpClass()
+        raw_data = copy.deepcopy(_base_raw_data())
+        raw_data.extend(copy.deepcopy(_INVALID_BLOCKS))
         raw_data[1]["value"]["invalid_name2"] = [
             {"type": "char1", "value": "foo", "id": "0003"}
         ]
@@ -93,34 +108,40 @@ class BadDataMigrationTestCase(TestCase, MigrationTestMixin):
 
     @classmethod
     def create_instance(cls):
-        instance = factories.SamplePageFactory(
-            content__0__char1__value="Char Block 1",
-            content__1="nestedstruct",
+        # revision dates are relative to the time the instance was created
+        cls.now = timezone.now()
+        # The stream data is shared with other test classes so that the nested block factories only
+        # need to run once. Each class still creates its own instance since the database is rolled
+        # back after every class.
+        cls.instance = factories.SamplePageFactory(
+            content=copy.deepcopy(_base_raw_data())
         )
-        cls.instance = instance
 
     @classmethod
-    def append_invalid_instance_data(cls):
-        raw_data = cls.instance.content.raw_data
-        raw_data.extend(
-            [
-                {
-                    "type": "invalid_name1",
-                    "id": "0001",
-                    "value": {"char1": "foo", "char2": "foo"},
-                },
-                {
-                    "type": "invalid_name1",
-                    "id": "0002",
-                    "value": {"char1": "foo", "char2": "foo"},
-                },
-            ]
+    def get_invalid_revision_message(cls):
+        return "Invalid block def in {} object ({}) for revision id ({}) created at {}".format(
+            cls.instance.__class__.__name__,
+            cls.instance.id,
+            cls.invalid_revision_id,
+            cls.invalid_revision_created_at,
         )
-        stream_block = cls.instance.content.stream_block
-        cls.instance.content = StreamValue(
-            stream_block=stream_block, stream_data=raw_data, is_lazy=True
+
+    @classmethod
+    def save_content(cls):
+        """Write the instance's current stream data to the content column of its row, without
+        going through `save`"""
+
+        type(cls.instance).objects.filter(pk=cls.instance.pk).update(
+            content=cls.instance.content
         )
-        cls.instance.save()
+
+    @classmethod
+    def append_invalid_instance_data(cls):
+        raw_data = cls.instance.content.raw_data
+        raw_data.extend(copy.deepcopy(_INVALID_BLOCKS))
+        # `raw_data` is a view on the instance's StreamValue, so extending it updates the value in
+        # place without having to build a new StreamValue
+        cls.save_content()
 
     @classmethod
     def create_invalid_revision(cls, delta):
@@ -129,22 +150,30 @@ class BadDataMigrationTestCase(TestCase, MigrationTestMixin):
 
         # remove the invalid data from the instance
         raw_data = cls.instance.content.raw_data
-        raw_data = raw_data[:2]
-        stream_block = cls.instance.content.stream_block
-        cls.instance.content = StreamValue(
-            stream_block=stream_block, stream_data=raw_data, is_lazy=True
-        )
-        cls.instance.save()
+        del raw_data[2:]
+        cls.save_content()
 
         return invalid_revision.id, invalid_revision.created_at
 
     @classmethod
     def create_revision(cls, delta):
         revision = cls.instance.save_revision()
-        revision.created_at = timezone.now() - datetime.timedelta(days=(delta))
-        revision.save()
+        revision.created_at = cls.now - datetime.timedelta(days=(delta))
+        revision.save(update_fields=["created_at"])
         return revision
 
+    @classmethod
+    def create_revisions(cls, deltas):
+        """Create a revision for each delta, saving all `created_at` values in one bulk update"""
+
+        revisions = []
+        for delta in deltas:
+            revision = cls.instance.save_revision()
+            revision.created_at = cls.now - datetime.timedelta(days=(delta))
+            revisions.append(revision)
+        type(revisions[0]).objects.bulk_update(revisions, ["created_at"])
+        return revisions
+
 
 class TestExceptionRaisedForInstance(BadDataMigrationTestCase):
     """Exception should always be raised when applying migration if it occurs while migrating the
@@ -154,15 +183,13 @@ class TestExceptionRaisedForInstance(BadDataMigrationTestCase):
     def setUpTestData(cls):
         cls.create_instance()
         cls.append_invalid_instance_data()
+        cls.expected_message = "Invalid block def in {} object ({})".format(
+            cls.instance.__class__.__name__, cls.instance.id
+        )
 
     def test_migrate(self):
 
-        with self.assertRaisesMessage(
-            InvalidBlockDefError,
-            "Invalid block def in {} object ({})".format(
-                self.instance.__class__.__name__, self.instance.id
-            ),
-        ):
+        with self.assertRaisesMessage(InvalidBlockDefError, self.expected_message):
             self.apply_migration(
                 revisions_from=timezone.now() + datetime.timedelta(days=2),
             )
@@ -176,21 +203,13 @@ class TestExceptionRaisedForLatestRevision(BadDataMigrationTestCase):
     def setUpTestData(cls):
         cls.create_instance()
 
-        for i in range(4):
-            cls.create_revision(5 - i)
+        cls.create_revisions(5 - i for i in range(4))
 
         cls.invalid_revision_id, cls.invalid_revision_created_at = cls.create_invalid_revision(0)
+        cls.expected_message = cls.get_invalid_revision_message()
 
     def test_migrate(self):
-        with self.assertRaisesMessage(
-            InvalidBlockDefError,
-            "Invalid block def in {} object ({}) for revision id ({}) created at {}".format(
-                self.instance.__class__.__name__,
-                self.instance.id,
-                self.invalid_revision_id,
-                self.invalid_revision_created_at,
-            ),
-        ):
+        with self.assertRaisesMessage(InvalidBlockDefError, self.expected_message):
             self.apply_migration(revisions_from=None)
 
 
@@ -204,21 +223,15 @@ class TestExceptionRaisedForLiveRevision(BadDataMigrationTestCase):
 
         cls.invalid_revision_id, cls.invalid_revision_created_at = cls.create_invalid_revision(5)
         cls.instance.live_revision_id = cls.invalid_revision_id
-        cls.instance.save()
+        type(cls.instance).objects.filter(pk=cls.instance.pk).update(
+            live_revision_id=cls.invalid_revision_id
+        )
 
-        for i in range(1, 5):
-            cls.create_revision(5 - i)
+        cls.create_revisions(5 - i for i in range(1, 5))
+        cls.expected_message = cls.get_invalid_revision_message()
 
     def test_migrate(self):
-        with self.assertRaisesMessage(
-            InvalidBlockDefError,
-            "Invalid block def in {} object ({}) for revision id ({}) created at {}".format(
-                self.instance.__class__.__name__,
-                self.instance.id,
-                self.invalid_revision_id,
-                self.invalid_revision_created_at,
-            ),
-        ):
+        with self.assertRaisesMessage(InvalidBlockDefError, self.expected_message):
             self.apply_migration(revisions_from=None)
 
 
@@ -233,23 +246,16 @@ class TestExceptionIgnoredForOtherRevisions(BadDataMigrationTestCase):
         cls.create_instance()
         cls.invalid_revision_id, cls.invalid_revision_created_at = cls.create_invalid_revision(5)
 
-        for i in range(1, 5):
-            cls.create_revision(5 - i)
+        cls.create_revisions(5 - i for i in range(1, 5))
+        cls.expected_message = "ERROR:{}:{}".format(
+            migrate_operation.__name__, cls.get_invalid_revision_message()
+        )
 
     def test_migrate(self):
         with self.assertLogs(level="ERROR") as cm:
             self.apply_migration(revisions_from=None)
 
-            self.assertEqual(
-                cm.output[0].splitlines()[0],
-                "ERROR:{}:Invalid block def in {} object ({}) for revision id ({}) created at {}".format(
-                    migrate_operation.__name__,
-                    self.instance.__class__.__name__,
-                    self.instance.id,
-                    self.invalid_revision_id,
-                    self.invalid_revision_created_at,
-                ),
-            )
+            self.assertEqual(cm.output[0].splitlines()[0], self.expected_message)
 
             self.assertEqual(
                 cm.output[0].splitlines()[-1],
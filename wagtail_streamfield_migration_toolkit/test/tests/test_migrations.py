@@ -1,5 +1,6 @@
 import json
 import datetime
+from collections import defaultdict
 from django.utils import timezone
 from django.test import TestCase
 
@@ -20,6 +21,7 @@ from wagtail_streamfield_migration_toolkit.operations import (
 class BaseMigrationTest(TestCase, MigrationTestMixin):
     factory = None
     has_revisions = False
+    revision_model = None
     default_operation_and_block_path = [
         (
             RenameStreamChildrenOperation(old_name="char1", new_name="renamed1"),
@@ -28,8 +30,22 @@ class BaseMigrationTest(TestCase, MigrationTestMixin):
     ]
     app_name = None
 
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Migrated data for each `revisions_from` value. Every test starts from the same fixtures,
+        # so the result of applying the migration can be shared by all tests in the class.
+        cls.migrated_data = {}
+
     @classmethod
     def setUpTestData(cls):
+        # All fixture dates are relative to the same point in time
+        now = timezone.now()
+        # `revisions_from` values for the tests, fixed here so that their migrated data can be
+        # reused. The past one falls between the dates of the last two revisions of each instance.
+        cls.revisions_from_future = now + datetime.timedelta(days=2)
+        cls.revisions_from_past = now - datetime.timedelta(days=1, hours=12)
+
         instances = []
         instances.append(
             cls.factory(
@@ -60,24 +76,102 @@ class BaseMigrationTest(TestCase, MigrationTestMixin):
         for instance in instances:
             cls.original_raw_data[instance.id] = instance.content.raw_data
 
-            if cls.has_revisions:
+        if cls.has_revisions:
+            # `created_at` and `live_revision` are only changed in memory here and written to the
+            # database with a single bulk update each after all revisions have been created.
+            revisions = []
+            instance_ids = {}
+            for instance in instances:
                 for i in range(5):
                     revision = instance.save_revision()
-                    revision.created_at = timezone.now() - datetime.timedelta(
-                        days=(5 - i)
-                    )
-                    revision.save()
+                    revision.created_at = now - datetime.timedelta(days=(5 - i))
+                    revisions.append(revision)
+                    instance_ids[revision.id] = instance.id
                     if i == 1:
                         instance.live_revision = revision
-                        instance.save()
-                cls.original_revisions[instance.id] = list(
-                    instance.revisions.all().order_by("id")
+
+            cls.revision_model = type(revisions[0])
+            cls.revision_model.objects.bulk_update(revisions, ["created_at"])
+            cls.model.objects.bulk_update(instances, ["live_revision"])
+
+            for revision in cls.revision_model.objects.filter(
+                id__in=instance_ids
+            ).order_by("id"):
+                cls.original_revisions.setdefault(instance_ids[revision.id], []).append(
+                    revision
                 )
 
+        # Decode the stored content of each original revision once, rather than in every test
+        cls.original_revision_content = {
+            instance_id: {
+                revision.id: json.loads(revision.content["content"])
+                for revision in revisions
+            }
+            for instance_id, revisions in cls.original_revisions.items()
+        }
+
+    def get_migrated_data(self, revisions_from=None):
+        """Apply the migration with the given `revisions_from`, or reuse the result of applying it
+
+        Returns a tuple of a dict mapping each instance id to its migrated raw content, and a dict
+        mapping each instance id to the migrated contents of its revisions.
+        """
+
+        if revisions_from not in self.migrated_data:
+            self.apply_migration(revisions_from=revisions_from)
+
+            # The raw JSON is needed here rather than `content.raw_data`, since the StreamField
+            # drops any blocks whose type is not in its current definition (such as `renamed1`)
+            # when loading.
+            raw_contents = dict(
+                self.model.objects.all()
+                .annotate(raw_content=Cast(F("content"), JSONField()))
+                .values_list("id", "raw_content")
+            )
+            revision_contents = (
+                self.get_migrated_revision_contents() if self.has_revisions else {}
+            )
+            self.migrated_data[revisions_from] = (raw_contents, revision_contents)
+
+        return self.migrated_data[revisions_from]
+
+    def get_migrated_revision_contents(self):
+        """Query the content of all original revisions after migrating, using a single query
+
+        Returns a dict mapping each instance id to the contents of its revisions, ordered by id.
+        """
+
+        instance_ids = {
+            revision.id: instance_id
+            for instance_id, revisions in self.original_revisions.items()
+            for revision in revisions
+        }
+        revision_contents = defaultdict(list)
+        for revision_id, content in (
+            self.revision_model.objects.filter(id__in=instance_ids)
+            .order_by("id")
+            .values_list("id", "content")
+        ):
+            revision_contents[instance_ids[revision_id]].append(content)
+        return revision_contents
+
+    def get_live_and_latest_revision_ids(self, instance):
+        latest_revision_id = (
+            instance.latest_revision_id
+            if WAGTAIL_VERSION >= (4, 0, 0)
+            else instance.get_latest_revision().id
+        )
+        return (instance.live_revision_id, latest_revision_id)
+
     def assertBlocksRenamed(self, old_content, new_content, is_altered=True):
+        # content which should not have been altered is expected to be identical
+        if not is_altered:
+            self.assertEqual(old_content, new_content)
+            return
+
         for old_block, new_block in zip(old_content, new_content):
             self.assertEqual(old_block["id"], new_block["id"])
-            if is_altered and old_block["type"] == "char1":
+            if old_block["type"] == "char1":
                 self.assertEqual(new_block["type"], "renamed1")
             else:
                 self.assertEqual(old_block["type"], new_block["type"])
@@ -90,17 +184,11 @@ class BaseMigrationTest(TestCase, MigrationTestMixin):
         whether ids and other block types are intact.
         """
 
-        self.apply_migration()
+        raw_contents, _ = self.get_migrated_data()
 
-        instances = self.model.objects.all().annotate(
-            raw_content=Cast(F("content"), JSONField())
-        )
-
-        for instance in instances:
-            prev_content = self.original_raw_data[instance.id]
-            self.assertBlocksRenamed(
-                old_content=prev_content, new_content=instance.raw_content
-            )
+        for instance_id, raw_content in raw_contents.items():
+            prev_content = self.original_raw_data[instance_id]
+            self.assertBlocksRenamed(old_content=prev_content, new_content=raw_content)
 
     # TODO test multiple operations applied in one migration
 
@@ -110,19 +198,18 @@ class BaseMigrationTest(TestCase, MigrationTestMixin):
         Applying migration with `revisions_from=None`, so all revisions should be updated.
         """
 
-        self.apply_migration()
-
-        instances = self.model.objects.all().annotate(
-            raw_content=Cast(F("content"), JSONField())
-        )
+        _, new_revision_contents = self.get_migrated_data()
+        instances = self.model.objects.all()
 
         for instance in instances:
             old_revisions = self.original_revisions[instance.id]
-            for old_revision, new_revision in zip(
-                old_revisions, instance.revisions.all().order_by("id")
+            for old_revision, new_revision_content in zip(
+                old_revisions, new_revision_contents[instance.id]
             ):
-                old_content = json.loads(old_revision.content["content"])
-                new_content = json.loads(new_revision.content["content"])
+                old_content = self.original_revision_content[instance.id][
+                    old_revision.id
+                ]
+                new_content = json.loads(new_revision_content["content"])
                 self.assertBlocksRenamed(
                     old_content=old_content, new_content=new_content
                 )
@@ -135,25 +222,23 @@ class BaseMigrationTest(TestCase, MigrationTestMixin):
         update in this case.
         """
 
-        revisions_from = timezone.now() + datetime.timedelta(days=2)
-        self.apply_migration(revisions_from=revisions_from)
-
-        instances = self.model.objects.all().annotate(
-            raw_content=Cast(F("content"), JSONField())
-        )
+        revisions_from = self.revisions_from_future
+        _, new_revision_contents = self.get_migrated_data(revisions_from=revisions_from)
+        instances = self.model.objects.all()
 
         for instance in instances:
             old_revisions = self.original_revisions[instance.id]
-            for old_revision, new_revision in zip(
-                old_revisions, instance.revisions.all().order_by("id")
+            live_and_latest_revision_ids = self.get_live_and_latest_revision_ids(
+                instance
+            )
+            for old_revision, new_revision_content in zip(
+                old_revisions, new_revision_contents[instance.id]
             ):
-                is_latest_or_live = old_revision.id == instance.live_revision_id or (
-                    old_revision.id == instance.latest_revision_id
-                    if WAGTAIL_VERSION >= (4, 0, 0)
-                    else old_revision.id == instance.get_latest_revision().id
-                )
-                old_content = json.loads(old_revision.content["content"])
-                new_content = json.loads(new_revision.content["content"])
+                is_latest_or_live = old_revision.id in live_and_latest_revision_ids
+                old_content = self.original_revision_content[instance.id][
+                    old_revision.id
+                ]
+                new_content = json.loads(new_revision_content["content"])
                 self.assertBlocksRenamed(
                     old_content=old_content,
                     new_content=new_content,
@@ -168,27 +253,25 @@ class BaseMigrationTest(TestCase, MigrationTestMixin):
         should be updated.
         """
 
-        revisions_from = timezone.now() - datetime.timedelta(days=2)
-        self.apply_migration(revisions_from=revisions_from)
-
-        instances = self.model.objects.all().annotate(
-            raw_content=Cast(F("content"), JSONField())
-        )
+        revisions_from = self.revisions_from_past
+        _, new_revision_contents = self.get_migrated_data(revisions_from=revisions_from)
+        instances = self.model.objects.all()
 
         for instance in instances:
             old_revisions = self.original_revisions[instance.id]
-            for old_revision, new_revision in zip(
-                old_revisions, instance.revisions.all().order_by("id")
+            live_and_latest_revision_ids = self.get_live_and_latest_revision_ids(
+                instance
+            )
+            for old_revision, new_revision_content in zip(
+                old_revisions, new_revision_contents[instance.id]
             ):
-                is_latest_or_live = old_revision.id == instance.live_revision_id or (
-                    old_revision.id == instance.latest_revision_id
-                    if WAGTAIL_VERSION >= (4, 0, 0)
-                    else old_revision.id == instance.get_latest_revision().id
-                )
+                is_latest_or_live = old_revision.id in live_and_latest_revision_ids
                 is_after_revisions_from = old_revision.created_at > revisions_from
                 is_altered = is_latest_or_live or is_after_revisions_from
-                old_content = json.loads(old_revision.content["content"])
-                new_content = json.loads(new_revision.content["content"])
+                old_content = self.original_revision_content[instance.id][
+                    old_revision.id
+                ]
+                new_content = json.loads(new_revision_content["content"])
                 self.assertBlocksRenamed(
                     old_content=old_content,
                     new_content=new_content,